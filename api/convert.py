@@ -1,116 +1,85 @@
-from http.server import BaseHTTPRequestHandler
-import json
+import asyncio
+import hashlib
 import os
 import sys
+import time
 from pathlib import Path
 import re
+from typing import List, Optional
+
+import orjson
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 # Add parent directory to path to import our conversion module
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 try:
-    from anthropic import Anthropic
+    from anthropic import AsyncAnthropic
     ANTHROPIC_AVAILABLE = True
 except ImportError:
     ANTHROPIC_AVAILABLE = False
 
 from scripts.convert import HTMLConverter
 
-
-class handler(BaseHTTPRequestHandler):
-    def do_POST(self):
-        """Handle POST requests for HTML conversion"""
-        try:
-            # Get content length
-            content_length = int(self.headers.get('Content-Length', 0))
-
-            # Read the request body
-            body = self.rfile.read(content_length)
-
-            # Parse multipart/form-data
-            boundary = self.headers.get('Content-Type', '').split('boundary=')[-1]
-
-            if not boundary:
-                self.send_error_response(400, "No boundary found in Content-Type")
-                return
-
-            # Parse form data
-            form_data = self.parse_multipart(body, boundary)
-
-            if 'file' not in form_data:
-                self.send_error_response(400, "No file uploaded")
-                return
-
-            html_content = form_data['file']
-            template_type = form_data.get('template_type', 'casino-review')
-            platform = form_data.get('platform', '')
-
-            # Check if Anthropic API key is available
-            api_key = os.environ.get('ANTHROPIC_API_KEY')
-
-            if api_key and ANTHROPIC_AVAILABLE:
-                # Use AI-powered conversion
-                converted_html = self.convert_with_ai(
-                    html_content,
-                    template_type,
-                    platform,
-                    api_key
-                )
-            else:
-                # Fall back to rule-based conversion
-                converted_html = self.convert_with_rules(
-                    html_content,
-                    template_type,
-                    platform
-                )
-
-            # Send success response
-            self.send_json_response({
-                'success': True,
-                'html': converted_html,
-                'method': 'ai' if (api_key and ANTHROPIC_AVAILABLE) else 'rules'
-            })
-
-        except Exception as e:
-            self.send_error_response(500, str(e))
-
-    def convert_with_ai(self, html_content, template_type, platform, api_key):
-        """Convert HTML using AI (Claude API)"""
-        try:
-            client = Anthropic(api_key=api_key)
-
-            # Load template
-            converter = HTMLConverter(
-                config_dir="../config",
-                templates_dir="../templates"
-            )
-
-            template_path = Path(__file__).parent.parent / "templates" / f"{template_type}.html"
-            with open(template_path, 'r', encoding='utf-8') as f:
-                template = f.read()
-
-            # Load config
-            config_path = Path(__file__).parent.parent / "config"
-            with open(config_path / "platform-metadata.json", 'r', encoding='utf-8') as f:
-                platform_metadata = json.load(f)
-
-            with open(config_path / "affiliate-links.json", 'r', encoding='utf-8') as f:
-                affiliate_links = json.load(f)
-
-            # Create AI prompt
-            prompt = f"""You are an expert HTML converter. Convert the following Word-exported HTML into a properly structured web page using the provided template.
-
-INPUT HTML:
-{html_content[:5000]}  # Limit to avoid token limits
-
-TEMPLATE TO FILL:
-{template[:3000]}
-
-AVAILABLE PLATFORMS:
-{json.dumps(list(platform_metadata.keys()))}
-
-AFFILIATE LINKS:
-{json.dumps(affiliate_links, indent=2)}
+# Module-level state survives across warm serverless invocations: the
+# converter's cached templates/configs, the Anthropic client's connection
+# pool, and the pre-warmed default template are all set up once per container.
+BASE_DIR = Path(__file__).parent.parent
+converter = HTMLConverter(
+    config_dir=str(BASE_DIR / "config"),
+    templates_dir=str(BASE_DIR / "templates")
+)
+converter.load_template(converter.templates_dir / "casino-review.html")
+
+API_KEY = os.environ.get('ANTHROPIC_API_KEY')
+client = AsyncAnthropic(api_key=API_KEY) if (API_KEY and ANTHROPIC_AVAILABLE) else None
+
+# Recent AI responses keyed by input hash, so identical uploads (e.g. a batch
+# re-export containing unchanged pages) skip the Claude round-trip entirely.
+# The TTL matches Anthropic's 5-minute prompt cache window.
+_AI_CACHE = {}
+_AI_CACHE_TTL = 300
+_AI_CACHE_MAX = 256
+
+# Word-exported HTML runs ~4 characters per token, so the prompt sections are
+# capped by token budget instead of bare character counts. The budgets come
+# out at the previous 5000/3000-char limits.
+_CHARS_PER_TOKEN = 4
+_INPUT_TOKEN_BUDGET = 1250
+_TEMPLATE_TOKEN_BUDGET = 750
+
+
+def truncate_to_budget(text, token_budget):
+    """Cap text to an approximate token budget"""
+    return text[:token_budget * _CHARS_PER_TOKEN]
+
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['*'],
+    allow_methods=['POST', 'OPTIONS'],
+    allow_headers=['Content-Type'],
+)
+
+
+def build_ai_request(truncated_html, template_type, platform):
+    """Build the messages.create kwargs for an AI conversion
+
+    Expects the input HTML to be pre-truncated via truncate_to_budget.
+    """
+    # Template and configs come from the converter's cached loaders
+    template = converter.load_template(
+        converter.templates_dir / f"{template_type}.html"
+    )
+    truncated_template = truncate_to_budget(template, _TEMPLATE_TOKEN_BUDGET)
+    platform_metadata = converter.platform_metadata
+    affiliate_links = converter.affiliate_links
+
+    # Build the prompt so the static parts (instructions, template,
+    # configs) form a cacheable prefix and only the user's HTML varies.
+    instructions = f"""You are an expert HTML converter. Convert the Word-exported HTML provided by the user into a properly structured web page using the provided template.
 
 INSTRUCTIONS:
 1. Extract all content from the input HTML (headings, paragraphs, tables, lists)
@@ -125,110 +94,158 @@ INSTRUCTIONS:
 
 Return the complete, valid HTML document."""
 
-            # Call Claude API
-            message = client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4096,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
-
-            # Extract HTML from response
-            response_text = message.content[0].text
-
-            # Try to extract just the HTML if there's explanatory text
-            html_match = re.search(r'<!DOCTYPE html>.*</html>', response_text, re.DOTALL | re.IGNORECASE)
-            if html_match:
-                return html_match.group(0)
-
-            return response_text
-
-        except Exception as e:
-            print(f"AI conversion error: {e}")
-            # Fall back to rule-based
-            return self.convert_with_rules(html_content, template_type, platform)
-
-    def convert_with_rules(self, html_content, template_type, platform):
-        """Convert HTML using existing rule-based converter"""
-        # Save temp file
-        temp_input = Path('/tmp') / 'input.html'
-        temp_output = Path('/tmp') / 'output.html'
-
-        with open(temp_input, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-
-        # Run converter
-        converter = HTMLConverter(
-            config_dir=str(Path(__file__).parent.parent / "config"),
-            templates_dir=str(Path(__file__).parent.parent / "templates")
+    static_context = f"""TEMPLATE TO FILL:
+{truncated_template}
+
+AVAILABLE PLATFORMS:
+{orjson.dumps(list(platform_metadata.keys())).decode()}
+
+AFFILIATE LINKS:
+{orjson.dumps(affiliate_links, option=orjson.OPT_INDENT_2).decode()}"""
+
+    # The cache_control breakpoint marks the end of the static prefix so
+    # repeat conversions only pay for the input HTML; the template +
+    # config block dominates the payload.
+    return {
+        'model': "claude-3-5-sonnet-20241022",
+        'max_tokens': 4096,
+        'system': [
+            {"type": "text", "text": instructions},
+            {
+                "type": "text",
+                "text": static_context,
+                "cache_control": {"type": "ephemeral"}
+            }
+        ],
+        'messages': [{
+            "role": "user",
+            "content": truncated_html
+        }]
+    }
+
+
+def extract_ai_response(message):
+    """Pull the converted HTML out of an API response"""
+    usage = getattr(message, 'usage', None)
+    if usage is not None:
+        print(
+            f"Prompt cache: created={getattr(usage, 'cache_creation_input_tokens', 0)} "
+            f"read={getattr(usage, 'cache_read_input_tokens', 0)}"
         )
 
-        converter.convert(str(temp_input), str(temp_output))
-
-        # Read result
-        with open(temp_output, 'r', encoding='utf-8') as f:
-            return f.read()
-
-    def parse_multipart(self, body, boundary):
-        """Parse multipart form data"""
-        boundary = boundary.encode() if isinstance(boundary, str) else boundary
-        parts = body.split(b'--' + boundary)
-        form_data = {}
-
-        for part in parts:
-            if not part or part == b'--\r\n' or part == b'--':
-                continue
-
-            # Split headers and content
-            if b'\r\n\r\n' in part:
-                headers, content = part.split(b'\r\n\r\n', 1)
-            else:
-                continue
-
-            # Extract field name
-            name_match = re.search(rb'name="([^"]+)"', headers)
-            if not name_match:
-                continue
-
-            field_name = name_match.group(1).decode('utf-8')
-
-            # Remove trailing boundary markers
-            content = content.rstrip(b'\r\n')
-
-            # Check if it's a file or regular field
-            if b'filename=' in headers:
-                # It's a file - decode as text
-                try:
-                    form_data[field_name] = content.decode('utf-8')
-                except:
-                    form_data[field_name] = content.decode('utf-8', errors='ignore')
-            else:
-                # It's a regular field
-                form_data[field_name] = content.decode('utf-8')
-
-        return form_data
-
-    def send_json_response(self, data, status=200):
-        """Send JSON response"""
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
-
-    def send_error_response(self, status, message):
-        """Send error response"""
-        self.send_json_response({
-            'success': False,
-            'error': message
-        }, status)
-
-    def do_OPTIONS(self):
-        """Handle OPTIONS for CORS"""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+    response_text = message.content[0].text
+
+    # Try to extract just the HTML if there's explanatory text
+    html_match = re.search(r'<!DOCTYPE html>.*</html>', response_text, re.DOTALL | re.IGNORECASE)
+    if html_match:
+        return html_match.group(0)
+
+    return response_text
+
+
+def convert_with_rules(html_content, template_type, platform):
+    """Convert HTML using existing rule-based converter"""
+    return converter.convert_string(html_content)
+
+
+def _ai_cache_key(truncated_html, template_type, platform):
+    """Stable cache key for an AI conversion's inputs"""
+    digest = hashlib.sha256(truncated_html.encode('utf-8')).hexdigest()
+    return (template_type, platform, digest)
+
+
+async def convert_with_ai(html_content, template_type, platform):
+    """Convert HTML using AI (Claude API)"""
+    # Slice once; the cache key and the prompt share the same substring
+    truncated_html = truncate_to_budget(html_content, _INPUT_TOKEN_BUDGET)
+
+    key = _ai_cache_key(truncated_html, template_type, platform)
+    cached = _AI_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[0] < _AI_CACHE_TTL:
+        return cached[1]
+
+    try:
+        request = build_ai_request(truncated_html, template_type, platform)
+        message = await client.messages.create(**request)
+        converted = extract_ai_response(message)
+
+        # Insertion order doubles as age order, so evict from the front
+        if len(_AI_CACHE) >= _AI_CACHE_MAX:
+            _AI_CACHE.pop(next(iter(_AI_CACHE)))
+        _AI_CACHE[key] = (time.monotonic(), converted)
+
+        return converted
+
+    except Exception as e:
+        print(f"AI conversion error: {e}")
+        # Fall back to rule-based
+        return await asyncio.to_thread(
+            convert_with_rules, html_content, template_type, platform
+        )
+
+
+async def convert_one(html_content, template_type, platform):
+    """Convert a single document via AI when available, rules otherwise"""
+    if client is not None:
+        return await convert_with_ai(html_content, template_type, platform)
+
+    # Rule-based conversion is CPU-bound; run it on a worker thread
+    return await asyncio.to_thread(
+        convert_with_rules, html_content, template_type, platform
+    )
+
+
+async def convert_batch(files, template_type, platform):
+    """Convert multiple files concurrently, one result dict per file"""
+    converted = await asyncio.gather(
+        *(convert_one(html, template_type, platform) for html in files),
+        return_exceptions=True
+    )
+
+    results = []
+    for item in converted:
+        if isinstance(item, Exception):
+            results.append({'success': False, 'error': str(item)})
+        else:
+            results.append({'success': True, 'html': item})
+    return results
+
+
+@app.post('/api/convert')
+@app.post('/convert')
+async def convert(
+    file: Optional[List[UploadFile]] = File(None),
+    template_type: str = Form('casino-review'),
+    platform: str = Form('')
+):
+    """Handle POST requests for HTML conversion"""
+    if not file:
+        return ORJSONResponse(
+            {'success': False, 'error': 'No file uploaded'},
+            status_code=400
+        )
+
+    try:
+        raw = [await upload.read() for upload in file]
+        method = 'ai' if client is not None else 'rules'
+
+        # The AI prompt needs str; the rule-based path hands the raw bytes
+        # straight to lxml, which decodes them itself during the parse
+        if client is not None:
+            contents = [body.decode('utf-8', errors='ignore') for body in raw]
+        else:
+            contents = raw
+
+        if len(contents) > 1:
+            # Batch upload: convert all files concurrently
+            results = await convert_batch(contents, template_type, platform)
+            return {'success': True, 'results': results, 'method': method}
+
+        converted_html = await convert_one(contents[0], template_type, platform)
+        return {'success': True, 'html': converted_html, 'method': method}
+
+    except Exception as e:
+        return ORJSONResponse(
+            {'success': False, 'error': str(e)},
+            status_code=500
+        )
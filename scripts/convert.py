@@ -4,184 +4,175 @@ HTML Conversion Tool
 Converts Word-exported HTML files into styled HTML using templates and config.
 """
 
+import functools
 import re
-import json
 import os
 import sys
 from pathlib import Path
 from datetime import datetime
 
+import orjson
+from lxml import html as lxml_html
+
+# Precompiled patterns shared across extractors
+_RATING_SLASH = re.compile(r'(\d+(?:\.\d+)?)\s*\/\s*(\d+)')
+_RATING_OUTOF = re.compile(r'(\d+(?:\.\d+)?)\s+out of\s+(\d+)')
+_PLACEHOLDER = re.compile(r'\{\{([^}]+)\}\}')
+
+# Star fragments for rating display
+_FILLED_STAR = '<span class="star" aria-hidden="true">★</span>'
+_EMPTY_STAR = '<span class="star empty" aria-hidden="true">☆</span>'
+
+# Static fallback fragments and placeholder-section defaults, built once
+_COMING_SOON = '<p>Coming soon...</p>'
+_DEFAULT_TEMPLATE_DATA = {
+    'quick_verdict_section': '<!-- Quick verdict coming soon -->',
+    'bonuses_content': '<p>Content coming soon...</p>',
+    'games_content': '<p>Content coming soon...</p>',
+    'payment_methods_content': '<p>Content coming soon...</p>',
+    'mobile_content': '<p>Content coming soon...</p>',
+    'customer_support_content': '<p>Content coming soon...</p>',
+    'security_content': '<p>Content coming soon...</p>',
+}
+
 class HTMLConverter:
     def __init__(self, config_dir="../config", templates_dir="../templates"):
         """Initialize the converter with config and template directories."""
-        self.config_dir = Path(__file__).parent / config_dir
-        self.templates_dir = Path(__file__).parent / templates_dir
-
-        # Load configurations
-        self.affiliate_links = self.load_json("affiliate-links.json")
-        self.platform_metadata = self.load_json("platform-metadata.json")
-        self.image_config = self.load_json("image-urls.json")
-
-    def load_json(self, filename):
-        """Load a JSON configuration file."""
-        filepath = self.config_dir / filename
+        self.config_dir = (Path(__file__).parent / config_dir).resolve()
+        self.templates_dir = (Path(__file__).parent / templates_dir).resolve()
+
+        # Load configurations (cached per path, so repeat instances are free)
+        self.affiliate_links = self.load_json(self.config_dir / "affiliate-links.json")
+        self.platform_metadata = self.load_json(self.config_dir / "platform-metadata.json")
+        self.image_config = self.load_json(self.config_dir / "image-urls.json")
+
+        # One alternation over every known platform name and key lets
+        # detect_platform find a match in a single scan of the document
+        # instead of one substring search per platform.
+        self._platform_terms = {}
+        for platform_key, metadata in self.platform_metadata.items():
+            self._platform_terms[metadata['name'].lower()] = platform_key
+            self._platform_terms[platform_key.lower()] = platform_key
+        if self._platform_terms:
+            self._platform_scan = re.compile('|'.join(
+                re.escape(term)
+                for term in sorted(self._platform_terms, key=len, reverse=True)
+            ))
+        else:
+            self._platform_scan = None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def load_json(filepath):
+        """Load a JSON configuration file, reading and parsing it only once."""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(filepath, 'rb') as f:
+                return orjson.loads(f.read())
         except FileNotFoundError:
-            print(f"Warning: Config file {filename} not found")
+            print(f"Warning: Config file {filepath.name} not found")
             return {}
 
-    def load_template(self, template_name):
-        """Load an HTML template file."""
-        filepath = self.templates_dir / template_name
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def load_template(filepath):
+        """Load an HTML template file, reading it only once per path."""
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 return f.read()
         except FileNotFoundError:
-            print(f"Warning: Template {template_name} not found")
+            print(f"Warning: Template {filepath.name} not found")
             return ""
 
     def load_component(self, component_name):
-        """Load a component template."""
-        filepath = self.templates_dir / "components" / component_name
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            print(f"Warning: Component {component_name} not found")
-            return ""
+        """Load a component template (cached via load_template)."""
+        return self.load_template(self.templates_dir / "components" / component_name)
 
-    def extract_headings(self, html):
-        """Extract all headings (h1, h2, h3) from HTML."""
+    def _extract_all(self, doc):
+        """Collect headings, paragraphs, tables and pros/cons in one tree walk."""
         headings = []
-
-        for level in ['h1', 'h2', 'h3']:
-            pattern = f'<{level}[^>]*>(.*?)</{level}>'
-            matches = re.finditer(pattern, html, re.IGNORECASE | re.DOTALL)
-
-            for match in matches:
-                text = re.sub(r'<[^>]+>', '', match.group(1)).strip()
-                headings.append({
-                    'level': level,
-                    'text': text,
-                    'position': match.start()
-                })
-
-        return sorted(headings, key=lambda x: x['position'])
-
-    def extract_paragraphs(self, html):
-        """Extract all paragraphs from HTML."""
         paragraphs = []
-        pattern = r'<p[^>]*>(.*?)</p>'
-        matches = re.finditer(pattern, html, re.IGNORECASE | re.DOTALL)
-
-        for match in matches:
-            text = re.sub(r'<[^>]+>', '', match.group(1)).strip()
-            if text and len(text) > 10:  # Only meaningful paragraphs
-                paragraphs.append(text)
-
-        return paragraphs
-
-    def extract_tables(self, html):
-        """Extract all tables from HTML."""
         tables = []
-        table_pattern = r'<table[^>]*>(.*?)</table>'
-        table_matches = re.finditer(table_pattern, html, re.IGNORECASE | re.DOTALL)
-
-        for table_match in table_matches:
-            table_html = table_match.group(0)
-            rows = []
-
-            row_pattern = r'<tr[^>]*>(.*?)</tr>'
-            row_matches = re.finditer(row_pattern, table_html, re.IGNORECASE | re.DOTALL)
-
-            for row_match in row_matches:
-                cells = []
-                cell_pattern = r'<t[dh][^>]*>(.*?)</t[dh]>'
-                cell_matches = re.finditer(cell_pattern, row_match.group(1), re.IGNORECASE)
-
-                for cell_match in cell_matches:
-                    cell_text = re.sub(r'<[^>]+>', '', cell_match.group(1)).strip()
-                    cells.append(cell_text)
-
-                if cells:
-                    rows.append(cells)
-
-            if rows:
-                tables.append({
-                    'rows': rows,
-                    'columns': len(rows[0]) if rows else 0,
-                    'position': table_match.start()
-                })
-
-        return tables
-
-    def extract_pros_cons(self, html):
-        """Extract pros and cons lists from HTML."""
         pros = []
         cons = []
+        pending_list = None  # pros/cons target armed by a matching <strong>
 
-        # Look for pros section
-        pros_pattern = r'<strong>Pros:?</strong>[\s\S]*?<ul>([\s\S]*?)</ul>'
-        pros_match = re.search(pros_pattern, html, re.IGNORECASE)
+        for el in doc.iter():
+            tag = el.tag
+            if not isinstance(tag, str):  # skip comments and PIs
+                continue
 
-        if pros_match:
-            li_pattern = r'<li>(.*?)</li>'
-            li_matches = re.finditer(li_pattern, pros_match.group(1), re.IGNORECASE)
-            for li_match in li_matches:
-                text = re.sub(r'<[^>]+>', '', li_match.group(1)).strip()
-                pros.append(text)
-
-        # Look for cons section
-        cons_pattern = r'<strong>Cons:?</strong>[\s\S]*?<ul>([\s\S]*?)</ul>'
-        cons_match = re.search(cons_pattern, html, re.IGNORECASE)
-
-        if cons_match:
-            li_pattern = r'<li>(.*?)</li>'
-            li_matches = re.finditer(li_pattern, cons_match.group(1), re.IGNORECASE)
-            for li_match in li_matches:
-                text = re.sub(r'<[^>]+>', '', li_match.group(1)).strip()
-                cons.append(text)
-
-        return pros, cons
+            if tag in ('h1', 'h2', 'h3'):
+                headings.append({
+                    'level': tag,
+                    'text': el.text_content().strip(),
+                    'position': el.sourceline
+                })
+            elif tag == 'p':
+                text = el.text_content().strip()
+                if text and len(text) > 10:  # Only meaningful paragraphs
+                    paragraphs.append(text)
+            elif tag == 'table':
+                rows = []
+                for row in el.xpath('.//tr'):
+                    cells = [cell.text_content().strip()
+                             for cell in row.xpath('.//td|.//th')]
+                    if cells:
+                        rows.append(cells)
+                if rows:
+                    tables.append({
+                        'rows': rows,
+                        'columns': len(rows[0]) if rows else 0,
+                        'position': el.sourceline
+                    })
+            elif tag == 'strong':
+                label = el.text_content().strip().lower()
+                if label.startswith('pros') and not pros:
+                    pending_list = pros
+                elif label.startswith('cons') and not cons:
+                    pending_list = cons
+            elif tag == 'ul' and pending_list is not None:
+                for li in el.xpath('./li'):
+                    pending_list.append(li.text_content().strip())
+                pending_list = None
+
+        return {
+            'headings': headings,
+            'paragraphs': paragraphs,
+            'tables': tables,
+            'pros': pros,
+            'cons': cons,
+        }
 
-    def detect_platform(self, html):
-        """Detect which platform this document is about."""
-        html_lower = html.lower()
+    def detect_platform(self, text_lower):
+        """Detect which platform this document is about (takes lowercased text)."""
+        if self._platform_scan is None:
+            return None
 
-        # Check against known platforms
-        for platform_key, metadata in self.platform_metadata.items():
-            platform_name = metadata['name'].lower()
-            if platform_name in html_lower or platform_key in html_lower:
-                return platform_key
+        # Single pass over the text; first platform mentioned wins
+        match = self._platform_scan.search(text_lower)
+        if match:
+            return self._platform_terms[match.group(0)]
 
         return None
 
-    def detect_page_type(self, html, headings):
-        """Detect the type of page (casino review, sportsbook review, comparison)."""
-        html_lower = html.lower()
+    def detect_page_type(self, text_lower, headings):
+        """Detect the type of page (takes lowercased text)."""
         heading_text = ' '.join([h['text'].lower() for h in headings])
 
         # Detection keywords
-        if 'casino' in html_lower and 'review' in html_lower:
+        if 'casino' in text_lower and 'review' in text_lower:
             return 'casino-review'
-        elif 'sportsbook' in html_lower or 'betting' in html_lower and 'review' in heading_text:
+        elif 'sportsbook' in text_lower or 'betting' in text_lower and 'review' in heading_text:
             return 'sportsbook-review'
-        elif 'best' in heading_text and ('crypto' in html_lower or 'comparison' in html_lower):
+        elif 'best' in heading_text and ('crypto' in text_lower or 'comparison' in text_lower):
             return 'crypto-comparison'
 
         return 'casino-review'  # Default
 
-    def extract_rating(self, html):
+    def extract_rating(self, text):
         """Extract rating from text like '6.9/10' or '5 out of 5'."""
-        patterns = [
-            r'(\d+(?:\.\d+)?)\s*\/\s*(\d+)',
-            r'(\d+(?:\.\d+)?)\s+out of\s+(\d+)',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, html)
+        for pattern in (_RATING_SLASH, _RATING_OUTOF):
+            match = pattern.search(text)
             if match:
                 return {
                     'rating_num': float(match.group(1)),
@@ -195,20 +186,15 @@ class HTMLConverter:
         filled = int(rating_num)
         empty = rating_total - filled
 
-        stars_html = ''
-        for _ in range(filled):
-            stars_html += '<span class="star" aria-hidden="true">★</span>'
-        for _ in range(empty):
-            stars_html += '<span class="star empty" aria-hidden="true">☆</span>'
-
-        return stars_html
+        # str * int repeats the fragment in one C-level copy
+        return _FILLED_STAR * filled + _EMPTY_STAR * empty
 
     def build_pros_cons_html(self, pros, cons):
         """Build the pros/cons grid HTML."""
         template = self.load_component("pros-cons.html")
 
-        pros_items = '\n            '.join([f'<li>{pro}</li>' for pro in pros])
-        cons_items = '\n            '.join([f'<li>{con}</li>' for con in cons])
+        pros_items = '\n            '.join(f'<li>{pro}</li>' for pro in pros)
+        cons_items = '\n            '.join(f'<li>{con}</li>' for con in cons)
 
         return template.replace('{{pros_items}}', pros_items).replace('{{cons_items}}', cons_items)
 
@@ -254,34 +240,33 @@ class HTMLConverter:
 
     def render_template(self, template_html, data):
         """Replace all {{placeholders}} in template with data."""
-        result = template_html
-        for key, value in data.items():
-            placeholder = f'{{{{{key}}}}}'
-            result = result.replace(placeholder, str(value))
-
-        # Remove any remaining unfilled placeholders
-        result = re.sub(r'\{\{[^}]+\}\}', '', result)
-
-        return result
-
-    def convert(self, input_file, output_file=None):
-        """Convert a Word HTML file to styled HTML."""
-        print(f"Converting: {input_file}")
-
-        # Read input file
-        with open(input_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-
-        # Extract content
-        headings = self.extract_headings(html_content)
-        paragraphs = self.extract_paragraphs(html_content)
-        tables = self.extract_tables(html_content)
-        pros, cons = self.extract_pros_cons(html_content)
-
-        # Detect page type and platform
-        page_type = self.detect_page_type(html_content, headings)
-        platform_key = self.detect_platform(html_content)
-        rating = self.extract_rating(html_content)
+        # Single linear scan: known keys are substituted and unfilled
+        # placeholders drop out as empty strings in the same pass.
+        return _PLACEHOLDER.sub(
+            lambda m: str(data.get(m.group(1), '')),
+            template_html
+        )
+
+    def convert_string(self, html_content):
+        """Convert Word HTML content (str or bytes) to styled HTML.
+
+        Raw bytes are handed straight to lxml, which detects the encoding
+        itself, so callers holding undecoded input can skip the decode.
+        """
+        # Parse once and extract everything in a single tree walk
+        doc = lxml_html.fromstring(html_content)
+        content = self._extract_all(doc)
+        headings = content['headings']
+        paragraphs = content['paragraphs']
+        tables = content['tables']
+        pros, cons = content['pros'], content['cons']
+
+        # Detect page type and platform from the tree's text, extracted and
+        # lowercased once instead of per check
+        text_lower = doc.text_content().lower()
+        page_type = self.detect_page_type(text_lower, headings)
+        platform_key = self.detect_platform(text_lower)
+        rating = self.extract_rating(text_lower)
 
         print(f"  Page type: {page_type}")
         print(f"  Platform: {platform_key}")
@@ -291,7 +276,7 @@ class HTMLConverter:
         print(f"  Pros: {len(pros)}, Cons: {len(cons)}")
 
         # Load appropriate template
-        template = self.load_template(f"{page_type}.html")
+        template = self.load_template(self.templates_dir / f"{page_type}.html")
 
         # Get platform metadata
         platform_metadata = self.platform_metadata.get(platform_key, {}) if platform_key else {}
@@ -302,34 +287,37 @@ class HTMLConverter:
         title = h1['text'] if h1 else f"{platform_name} Review"
 
         # Build components
-        pros_cons_html = self.build_pros_cons_html(pros, cons) if pros or cons else '<p>Coming soon...</p>'
-        quick_facts_html = self.build_table_html(tables[0]) if tables and tables[0]['columns'] == 2 else '<p>Coming soon...</p>'
+        pros_cons_html = self.build_pros_cons_html(pros, cons) if pros or cons else _COMING_SOON
+        quick_facts_html = self.build_table_html(tables[0]) if tables and tables[0]['columns'] == 2 else _COMING_SOON
         cta_button_html = self.build_cta_button(platform_key) if platform_key else ''
 
-        # Prepare template data
-        template_data = {
-            'title': title,
-            'meta_description': paragraphs[0][:155] if paragraphs else '',
-            'year': datetime.now().year,
-            'platform_name': platform_name,
-            'intro_paragraph_1': paragraphs[0] if len(paragraphs) > 0 else '',
-            'intro_paragraph_2': paragraphs[1] if len(paragraphs) > 1 else '',
-            'pros_cons_grid': pros_cons_html,
-            'quick_facts_table': quick_facts_html,
-            'cta_button': cta_button_html,
-            'disclaimer': self.image_config.get('disclaimers', {}).get('gambling_warning', ''),
-            # Placeholder sections
-            'quick_verdict_section': '<!-- Quick verdict coming soon -->',
-            'bonuses_content': '<p>Content coming soon...</p>',
-            'games_content': '<p>Content coming soon...</p>',
-            'payment_methods_content': '<p>Content coming soon...</p>',
-            'mobile_content': '<p>Content coming soon...</p>',
-            'customer_support_content': '<p>Content coming soon...</p>',
-            'security_content': '<p>Content coming soon...</p>',
-        }
+        # Prepare template data: static placeholder sections come from the
+        # module-level defaults, merged with the per-document values
+        template_data = dict(_DEFAULT_TEMPLATE_DATA,
+            title=title,
+            meta_description=paragraphs[0][:155] if paragraphs else '',
+            year=datetime.now().year,
+            platform_name=platform_name,
+            intro_paragraph_1=paragraphs[0] if len(paragraphs) > 0 else '',
+            intro_paragraph_2=paragraphs[1] if len(paragraphs) > 1 else '',
+            pros_cons_grid=pros_cons_html,
+            quick_facts_table=quick_facts_html,
+            cta_button=cta_button_html,
+            disclaimer=self.image_config.get('disclaimers', {}).get('gambling_warning', ''),
+        )
 
         # Render final HTML
-        final_html = self.render_template(template, template_data)
+        return self.render_template(template, template_data)
+
+    def convert(self, input_file, output_file=None):
+        """Convert a Word HTML file to styled HTML."""
+        print(f"Converting: {input_file}")
+
+        # Read input file as bytes; lxml handles the decoding
+        with open(input_file, 'rb') as f:
+            html_content = f.read()
+
+        final_html = self.convert_string(html_content)
 
         # Determine output file
         if not output_file: